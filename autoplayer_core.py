@@ -7,10 +7,12 @@
 
 from __future__ import annotations
 from dataclasses import dataclass, asdict, field
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from queue import Queue
-from typing import Dict, List, Optional, Tuple
-import json, threading, time, sys, math, random
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import json, threading, time, sys, math, random, hashlib, re, string, ctypes
 
 import win32gui
 from pynput.keyboard import Controller, Key
@@ -19,6 +21,7 @@ __all__ = [
     "CFG", "save_cfg", "windows", "Player",
     "press", "release", "SHIFT_MAP",
     "read_sheet_meta", "write_sheet_meta",              # ← new helpers
+    "wake_gate",
 ]
 
 # ───────── constants ────────────────────────────────────────────────
@@ -30,6 +33,11 @@ SHIFT_MAP: Dict[str, str] = {
     "{": "[", "}": "]", ":": ";", '"': "'", "<": ",", ">": ".", "?": "/"
 }
 SHIFT_REV: Dict[str, str] = {v: k for k, v in SHIFT_MAP.items()}
+_SHIFT_CHAR_SET = frozenset(SHIFT_MAP)
+
+# one token per match: a [chord] (closing bracket optional at end of line)
+# or any other single non-blank character
+_TOKEN_RE = re.compile(r"\[([^\]]*)\]?|(\S)")
 
 NEIGHBOURS: Dict[str, List[str]] = {
     "a":["s","q","w","z"], "s":["a","d","w","e","x","z"],
@@ -42,6 +50,10 @@ NEIGHBOURS: Dict[str, List[str]] = {
     "u":["y","i","j","h"], "i":["u","o","k","j"], "o":["i","p","l","k"],
     "p":["o","l"]
 }
+# slip lookup, built once: key → tuple of neighbours, unknown keys fall
+# back to any key of the home rows
+_NBR_TABLE: Dict[str, Tuple[str, ...]] = {k: tuple(v) for k, v in NEIGHBOURS.items()}
+_FALLBACK_KEYS: Tuple[str, ...] = tuple(NEIGHBOURS)
 
 KB = Controller()
 
@@ -63,6 +75,11 @@ def read_sheet_meta(path: Path) -> dict:
         pass
     return {}
 
+# path → (mtime_ns, meta) of the last #META we wrote; lets write_sheet_meta
+# skip re-reading the header – or the whole write – as long as nobody else
+# touched the file
+_META_CACHE: Dict[Path, Tuple[int, dict]] = {}
+
 def write_sheet_meta(
         path: Path,
         bpm: int | None = None,
@@ -72,21 +89,37 @@ def write_sheet_meta(
     """
     Update the #META line at the top of *path*.
     Any argument left as None keeps its previous value.
+    The line is patched in place when the new header is no longer than
+    the old one; otherwise the file is rewritten.
     """
     try:
-        meta = read_sheet_meta(path)           # start with what’s already there
+        cached = _META_CACHE.get(path)
+        if cached and cached[0] != path.stat().st_mtime_ns:
+            cached = None                       # edited elsewhere
+        meta = dict(cached[1]) if cached else read_sheet_meta(path)
         if bpm    is not None: meta["bpm"]    = bpm
         if subdiv is not None: meta["subdiv"] = subdiv
         if note   is not None: meta["note"]   = note
+        if cached and meta == cached[1]:
+            return                              # same values re-asserted
 
         header = f'#META {json.dumps(meta, ensure_ascii=False)}'
-        lines  = path.read_text("utf-8").splitlines()
-        if lines and lines[0].lstrip().startswith("#META"):
-            lines[0] = header
-        else:
-            lines.insert(0, header)
+        new    = header.encode("utf-8")
+        with path.open("r+b") as f:
+            old = f.readline().rstrip(b"\r\n")
+            in_place = old.lstrip().startswith(b"#META") and len(new) <= len(old)
+            if in_place:
+                f.seek(0); f.write(new.ljust(len(old)))
+
+        if not in_place:
+            lines = path.read_text("utf-8").splitlines()
+            if lines and lines[0].lstrip().startswith("#META"):
+                lines[0] = header
+            else:
+                lines.insert(0, header)
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
-        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        _META_CACHE[path] = (path.stat().st_mtime_ns, meta)
     except Exception as exc:
         print("⚠ meta write:", exc, file=sys.stderr)
 # ───────── persistent config ────────────────────────────────────────
@@ -102,9 +135,19 @@ class Config:
     auto_pause: bool = True
     dark: bool = False
     target_title: Optional[str] = field(default=None, repr=False)
+    target_hwnd: int = field(default=0, repr=False)     # runtime only
+
+    _RUNTIME = ("target_hwnd",)             # not written to DATA_FILE
 
-    def sec_per_tok(self) -> float:
-        return 60 / (self.bpm * self.subdiv)
+    # sec_per_tok (float) is kept as a plain attribute, recomputed only
+    # when bpm / subdiv are assigned – and only while their product is
+    # positive, so a half-typed "0" BPM keeps the last usable value
+    sec_per_tok = 60 / (bpm * subdiv)       # class default, not a field
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in ("bpm", "subdiv") and self.bpm * self.subdiv > 0:
+            super().__setattr__("sec_per_tok", 60 / (self.bpm * self.subdiv))
 
 CFG = Config()
 
@@ -119,35 +162,353 @@ if DATA_FILE.exists():
 
 def save_cfg() -> None:
     DATA_FILE.write_text(json.dumps(
-        {k: (str(v) if isinstance(v, Path) else v) for k, v in asdict(CFG).items()},
+        {k: (str(v) if isinstance(v, Path) else v) for k, v in asdict(CFG).items()
+         if k not in Config._RUNTIME},
         indent=2))
 
 # ───────── keyboard helpers ─────────────────────────────────────────
+def _key_entry(ch: str) -> Tuple[bool, str]:
+    """(needs Shift, key to send) for one sheet character."""
+    if ch in SHIFT_MAP: return True, SHIFT_MAP[ch]
+    if ch.isupper():    return True, ch.lower()
+    return False, ch
+
+# every printable key resolved once; anything else falls back to _key_entry
+_KEY_TABLE: Dict[str, Tuple[bool, str]] = {
+    c: _key_entry(c) for c in string.printable if not c.isspace()
+}
+
 def press(ch: str):
-    if ch in SHIFT_MAP:
-        KB.press(Key.shift); KB.press(SHIFT_MAP[ch])
-    elif ch.isupper():
-        KB.press(Key.shift); KB.press(ch.lower())
-    else:
-        KB.press(ch)
+    shift, base = _KEY_TABLE.get(ch) or _key_entry(ch)
+    if shift: KB.press(Key.shift)
+    KB.press(base)
 
 def release(ch: str):
-    if ch in SHIFT_MAP:
-        KB.release(SHIFT_MAP[ch]); KB.release(Key.shift)
-    elif ch.isupper():
-        KB.release(ch.lower()); KB.release(Key.shift)
-    else:
-        KB.release(ch)
+    shift, base = _KEY_TABLE.get(ch) or _key_entry(ch)
+    KB.release(base)
+    if shift: KB.release(Key.shift)
+
+@lru_cache(maxsize=512)
+def _needs_shift_cached(tok: str | Tuple[str, ...]) -> bool:
+    if isinstance(tok, tuple):
+        return any(_needs_shift_cached(t) for t in tok)
+    return tok in _SHIFT_CHAR_SET or tok.isupper()
+
+# ───────── batched chord input (SendInput) ──────────────────────────
+INPUT_KEYBOARD  = 1
+KEYEVENTF_KEYUP = 0x0002
+MAPVK_VK_TO_VSC = 0
+VK_SHIFT        = 0x10
+
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", ctypes.c_uint16), ("wScan", ctypes.c_uint16),
+                ("dwFlags", ctypes.c_uint32), ("time", ctypes.c_uint32),
+                ("dwExtraInfo", ctypes.c_size_t)]
+
+class _MOUSEINPUT(ctypes.Structure):        # only here to size the union
+    _fields_ = [("dx", ctypes.c_int32), ("dy", ctypes.c_int32),
+                ("mouseData", ctypes.c_uint32), ("dwFlags", ctypes.c_uint32),
+                ("time", ctypes.c_uint32), ("dwExtraInfo", ctypes.c_size_t)]
+
+class _INPUT(ctypes.Structure):
+    class _U(ctypes.Union):
+        _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT)]
+    _anonymous_ = ("u",)
+    _fields_ = [("type", ctypes.c_uint32), ("u", _U)]
+
+try:
+    _user32 = ctypes.windll.user32
+    _user32.SendInput.argtypes = (ctypes.c_uint, ctypes.POINTER(_INPUT), ctypes.c_int)
+    _user32.VkKeyScanW.restype  = ctypes.c_short
+except AttributeError:                      # not on Windows
+    _user32 = None
+
+@lru_cache(maxsize=128)
+def _vk(ch: str) -> Tuple[int, int]:
+    """(virtual-key, scan code) of an unshifted key; vk -1 if not on the layout."""
+    vk = _user32.VkKeyScanW(ord(ch))
+    if vk == -1 or vk & 0xFF00:             # missing, or needs a modifier itself
+        return -1, 0
+    vk &= 0xFF
+    return vk, _user32.MapVirtualKeyW(vk, MAPVK_VK_TO_VSC)
+
+def _send_batch(chars: List[str], down: bool) -> None:
+    """
+    Press (or release, in reverse order) all *chars* with one SendInput
+    call, producing the same key order press()/release() per char would:
+    Shift goes down just before the first shifted key and comes up right
+    after the last one is released.  Falls back to press()/release() per
+    key when a key can't be mapped.
+    """
+    keys = [_KEY_TABLE.get(c) or _key_entry(c) for c in chars]
+    vks  = [_vk(b) for _, b in keys] if _user32 else None
+    if not vks or any(vk == -1 for vk, _ in vks):
+        if down:
+            for c in chars: press(c)
+        else:
+            for c in reversed(chars): release(c)
+        return
+
+    shift = (VK_SHIFT, _user32.MapVirtualKeyW(VK_SHIFT, MAPVK_VK_TO_VSC))
+    pairs = zip(keys, vks) if down else zip(reversed(keys), reversed(vks))
+    seq, shifted = [], False
+    for (needs_shift, _), vk in pairs:
+        if down and needs_shift and not shifted:
+            seq.append(shift); shifted = True
+        seq.append(vk)
+        if not down and needs_shift and not shifted:
+            seq.append(shift); shifted = True
+
+    arr = (_INPUT * len(seq))()
+    for inp, (vk, scan) in zip(arr, seq):
+        inp.type = INPUT_KEYBOARD
+        inp.ki.wVk, inp.ki.wScan = vk, scan
+        inp.ki.dwFlags = 0 if down else KEYEVENTF_KEYUP
+    _user32.SendInput(len(seq), arr, ctypes.sizeof(_INPUT))
 
 # ───────── window list helper ───────────────────────────────────────
+WIN_TTL = 0.5                               # s a window list is reused
+_WIN_CACHE: Tuple[float, list[Tuple[int, str]]] = (-WIN_TTL, [])
+
 def windows() -> list[Tuple[int, str]]:
-    out: list[Tuple[int, str]] = []
-    win32gui.EnumWindows(
-        lambda h, _:
-            out.append((h, win32gui.GetWindowText(h)))
-            if win32gui.IsWindowVisible(h) and win32gui.GetWindowText(h)
-            else None, None)
-    return sorted(out, key=lambda t: t[1].lower())
+    """Visible, titled top-level windows as (hwnd, title), sorted by title."""
+    global _WIN_CACHE
+    now = time.perf_counter()
+    if now - _WIN_CACHE[0] < WIN_TTL:
+        return list(_WIN_CACHE[1])
+
+    found: list[Tuple[int, str, str]] = []
+    def collect(h, _):
+        if win32gui.IsWindowVisible(h):
+            title = win32gui.GetWindowText(h)
+            if title: found.append((h, title, title.casefold()))
+    win32gui.EnumWindows(collect, None)
+    found.sort(key=itemgetter(2))
+
+    out = [(h, t) for h, t, _ in found]
+    _WIN_CACHE = (now, out)
+    return list(out)
+
+# ───────── humanise math ───────────────────────────────────────────
+_DRIFT_W = 2 * math.pi * 0.25                 # tempo drift: one cycle / 4 s
+
+def _human_strength(human: float) -> float:
+    h = human * 100
+    if h == 0:  return 0.0
+    if h <= 50: return 0.30 * (h / 50)
+    if h <= 75: return 0.30 + 0.30 * (h - 50) / 25
+    return 0.60 + 0.40 * (h - 75) / 25
+
+@lru_cache(maxsize=128)
+def _base_params(human: float) -> Tuple[float, ...]:
+    """Humanise constants that only depend on the slider – computed once per value."""
+    s = _human_strength(human)
+    if s == 0:      # robot mode – everything zeroed
+        return 0, 0, 0, 0, 0, 0, 0
+
+    s2         = s * s
+    σ          = 0.12 * s2
+    span       = 0.08 * s2
+    drift      = 0.20 * s2
+    hold_jit   = 1.20 * s2
+
+    hi         = max(0.0, (human*100 - 75)/25)
+    hi2        = hi * hi
+    p_drop     = 0.40 * hi2
+    p_slip     = 0.10 * hi2 * hi
+    p_shift    = 0.25 * hi2
+    return σ, span, drift, hold_jit, p_drop, p_slip, p_shift
+
+def _compute_params(human: float, dens: float) -> Tuple[float, ...]:
+    """σ, span, drift, hold_jit, p_drop, p_slip, p_shift for one token."""
+    σ, span, drift, hold_jit, p_drop, p_slip, p_shift = _base_params(human)
+    if not p_drop:  # below 75 % the probabilities are all zero
+        return σ, span, drift, hold_jit, 0, 0, 0
+    factor = 0.3 + 0.7 * dens
+    return σ, span, drift, hold_jit, p_drop*factor, p_slip*factor, p_shift*factor
+
+def _compute_timing(spt: float, drift: float, σ: float, t: float,
+                    z: float) -> Tuple[float, float]:
+    """
+    (token length, onset offset) – *t* is seconds since playback start,
+    *z* the token's standard-normal draw from the schedule.
+    """
+    sec = spt * (1 + drift * math.sin(_DRIFT_W * t))
+    return sec, σ * z
+
+SCHED_BLOCK = 256                           # tokens drawn per schedule batch
+
+class _Schedule(NamedTuple):
+    """Unit random draws for a block of tokens, scaled by the live params."""
+    onset: List[float]      # standard normal  → × σ
+    hold:  List[float]      # uniform [-1, 1)  → × hold_jit
+    drop:  List[int]        # 16 random bits   vs p_drop  · P_SCALE
+    slip:  List[int]        # 16 random bits   vs p_slip  · P_SCALE
+    shift: List[int]        # 16 random bits   vs p_shift · P_SCALE
+
+P_SCALE = 1 << 16                           # probability → 16-bit threshold
+
+def _build_schedule(n: int, rng: random.Random) -> _Schedule:
+    """
+    Draw the per-token randomness for *n* tokens in one go.  Only unit
+    variates are stored so BPM / Humanise edits still apply to the next note.
+    """
+    gauss, rnd, bits = rng.gauss, rng.random, rng.getrandbits
+    return _Schedule(
+        onset=[gauss(0.0, 1.0) for _ in range(n)],
+        hold =[2.0 * rnd() - 1.0 for _ in range(n)],
+        drop =[bits(16) for _ in range(n)],
+        slip =[bits(16) for _ in range(n)],
+        shift=[bits(16) for _ in range(n)],
+    )
+
+# ───────── sheet token count ───────────────────────────────────────
+# digest of the sheet bytes → token count, so replaying an unchanged sheet
+# reports its length without another pass (edits invalidate by hash)
+_TOK_CACHE: Dict[bytes, int] = {}
+
+def _count_tokens(txt: str) -> int:
+    """Number of tokens Player._tokenise would yield, without building them."""
+    n = 0
+    for line in txt.splitlines():
+        if line.lstrip().startswith("#"):
+            continue
+        for m in _TOKEN_RE.finditer(line):
+            chord = m.group(1)
+            if chord is None or any(not c.isspace() and (c.isalnum() or c in SHIFT_MAP)
+                                    for c in chord):
+                n += 1
+    return n
+
+def _load_sheet(path: Path) -> Tuple[str, int]:
+    """(sheet text, token count) for *path*."""
+    raw    = path.read_bytes()
+    digest = hashlib.blake2b(raw, digest_size=16).digest()
+    txt    = raw.decode("utf-8")
+    total  = _TOK_CACHE.get(digest)
+    if total is None:
+        total = _TOK_CACHE[digest] = _count_tokens(txt)
+    return txt, total
+
+# ───────── foreground-window check ─────────────────────────────────
+FG_TTL = 0.2                                # seconds a polled lookup stays valid
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT   = 0x0000
+
+_fg_cache = {"t": 0.0, "hwnd": 0, "hooked": False}
+_GATE = threading.Condition()               # notified on focus / pause / stop
+_gate_seq = 0                               # bumped per notify, so no wake-up is lost
+_hook_started = False
+
+def _note_foreground(fg: int) -> None:
+    _fg_cache["hwnd"] = fg
+    if not (CFG.target_hwnd and win32gui.IsWindow(CFG.target_hwnd)):
+        CFG.target_hwnd = fg if win32gui.GetWindowText(fg) == CFG.target_title else 0
+
+def _target_focused() -> bool:
+    """
+    True while CFG.target_hwnd is the foreground window.  With the WinEvent
+    hook running the cached HWND is pushed to us; otherwise it is polled at
+    most every FG_TTL s.  The target is re-resolved by title only when its
+    handle is unset or gone.
+    """
+    now = time.perf_counter()
+    if not _fg_cache["hooked"] and now - _fg_cache["t"] > FG_TTL:
+        _fg_cache["t"] = now
+        _note_foreground(win32gui.GetForegroundWindow())
+    elif not CFG.target_hwnd:
+        _note_foreground(_fg_cache["hwnd"])
+    return bool(CFG.target_hwnd) and _fg_cache["hwnd"] == CFG.target_hwnd
+
+def _focus_hook_loop() -> None:
+    """Message pump for an EVENT_SYSTEM_FOREGROUND hook (own daemon thread)."""
+    from ctypes import wintypes
+    user32 = ctypes.windll.user32
+    WinEventProc = ctypes.WINFUNCTYPE(
+        None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+        wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+    user32.SetWinEventHook.restype  = wintypes.HANDLE
+    user32.SetWinEventHook.argtypes = (wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE,
+                                       WinEventProc, wintypes.DWORD, wintypes.DWORD,
+                                       wintypes.DWORD)
+
+    def on_event(_hook, _event, hwnd, *_):
+        _note_foreground(hwnd or 0)         # Win32 calls stay outside _GATE
+        wake_gate()
+
+    proc = WinEventProc(on_event)           # keep a reference for the hook's lifetime
+    if not user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND,
+                                  None, proc, 0, 0, WINEVENT_OUTOFCONTEXT):
+        return                              # stay on polling
+    _note_foreground(win32gui.GetForegroundWindow())
+    _fg_cache["hooked"] = True
+    msg = wintypes.MSG()
+    while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+        user32.TranslateMessage(ctypes.byref(msg))
+        user32.DispatchMessageW(ctypes.byref(msg))
+
+def _start_focus_hook() -> None:
+    global _hook_started
+    if _hook_started: return
+    _hook_started = True
+    threading.Thread(target=_focus_hook_loop, daemon=True).start()
+
+def wake_gate() -> None:
+    """Make a waiting player re-check pause / focus now (e.g. after settings edits)."""
+    global _gate_seq
+    with _GATE:
+        _gate_seq += 1
+        _GATE.notify_all()
+
+# ───────── high-resolution waits ───────────────────────────────────
+CREATE_WAITABLE_TIMER_HIGH_RESOLUTION = 0x00000002
+TIMER_ALL_ACCESS = 0x1F0003
+INFINITE = 0xFFFFFFFF
+MAX_LAG  = 0.02                             # s of lateness the grid will catch up
+
+class _Clock:
+    """
+    Deadline waits on the perf_counter() clock.  Uses a Win10 1803+
+    high-resolution waitable timer when available and raises the system
+    timer resolution to 1 ms while playing; falls back to time.sleep.
+    """
+    def __init__(self):
+        self._k32 = self._timer = self._winmm = None
+        try:
+            self._winmm = ctypes.windll.winmm
+            self._winmm.timeBeginPeriod(1)
+            k32 = ctypes.windll.kernel32
+            k32.CreateWaitableTimerExW.restype = ctypes.c_void_p
+            k32.SetWaitableTimer.argtypes = (ctypes.c_void_p, ctypes.POINTER(ctypes.c_longlong),
+                                             ctypes.c_long, ctypes.c_void_p, ctypes.c_void_p,
+                                             ctypes.c_int)
+            k32.WaitForSingleObject.argtypes = (ctypes.c_void_p, ctypes.c_ulong)
+            k32.CloseHandle.argtypes = (ctypes.c_void_p,)
+            timer = k32.CreateWaitableTimerExW(None, None,
+                                               CREATE_WAITABLE_TIMER_HIGH_RESOLUTION,
+                                               TIMER_ALL_ACCESS)
+            if timer:
+                self._k32, self._timer = k32, timer
+                self._due = ctypes.c_longlong()
+                self._due_ref = ctypes.byref(self._due)
+        except Exception:
+            pass
+
+    def wait_until(self, deadline: float) -> None:
+        rem = deadline - time.perf_counter()
+        if rem <= 0: return
+        if self._timer:
+            self._due.value = -int(rem * 10_000_000)     # relative, 100 ns units
+            if self._k32.SetWaitableTimer(self._timer, self._due_ref, 0, None, None, 0):
+                self._k32.WaitForSingleObject(self._timer, INFINITE)
+                return
+        time.sleep(rem)
+
+    def close(self) -> None:
+        if self._timer:
+            self._k32.CloseHandle(self._timer); self._timer = None
+        if self._winmm:
+            self._winmm.timeEndPeriod(1); self._winmm = None
 
 # ───────── Player thread ────────────────────────────────────────────
 class Player(threading.Thread):
@@ -158,37 +519,18 @@ class Player(threading.Thread):
         self.stop_evt   = threading.Event()
         self._last_token_time = time.time()
         self._last_shift_needed = False        # for sticky-Shift
+        self._rng = random.Random()            # private to this thread, no shared state
 
-    def toggle(self): self.resume_evt.clear() if self.resume_evt.is_set() else self.resume_evt.set()
-    def stop(self):   self.stop_evt.set()
+    def toggle(self):
+        self.resume_evt.clear() if self.resume_evt.is_set() else self.resume_evt.set()
+        wake_gate()
+    def stop(self):
+        self.stop_evt.set()
+        wake_gate()
 
-    # strength mapping ------------------------------------------------
-    @staticmethod
-    def _human_strength() -> float:
-        h = CFG.human * 100
-        if h == 0:  return 0.0
-        if h <= 50: return 0.30 * (h / 50)
-        if h <= 75: return 0.30 + 0.30 * (h - 50) / 25
-        return 0.60 + 0.40 * (h - 75) / 25
-
-    # parameters (density-aware) -------------------------------------
-    def _params(self, dens: float):
-        s = self._human_strength()
-        if s == 0:      # robot mode – everything zeroed
-            return 0, 0, 0, 0, 0, 0, 0
-
-        σ          = 0.12 * s**2
-        span       = 0.08 * s**2
-        drift      = 0.20 * s**2
-        hold_jit   = 1.20 * s**2
-
-        hi         = max(0.0, (CFG.human*100 - 75)/25)
-        p_drop     = 0.40 * hi**2
-        p_slip     = 0.10 * hi**3
-        p_shift    = 0.25 * hi**2
-
-        factor = 0.3 + 0.7 * dens
-        return σ, span, drift, hold_jit, p_drop*factor, p_slip*factor, p_shift*factor
+    def _may_play(self) -> bool:
+        return self.resume_evt.is_set() and not (
+            CFG.auto_pause and CFG.target_title and not _target_focused())
 
     # tokeniser (now skips lines starting with '#') -------------------
     @staticmethod
@@ -196,116 +538,120 @@ class Player(threading.Thread):
         for line in txt.splitlines():
             if line.lstrip().startswith("#"):   # skip #META / comments
                 continue
-            i = 0
-            while i < len(line):
-                if line[i] == "[":
-                    chord = []; i += 1
-                    while i < len(line) and line[i] != "]":
-                        if not line[i].isspace() and (line[i].isalnum() or line[i] in SHIFT_MAP):
-                            chord.append(line[i])
-                        i += 1
-                    if chord: yield chord
-                elif not line[i].isspace():
-                    yield line[i]
-                i += 1
+            for m in _TOKEN_RE.finditer(line):
+                chord = m.group(1)
+                if chord is None:
+                    yield m.group(2)
+                    continue
+                chord = [c for c in chord
+                         if not c.isspace() and (c.isalnum() or c in SHIFT_MAP)]
+                if chord: yield chord
 
     @staticmethod
     def _needs_shift(tok) -> bool:
-        if isinstance(tok, list):
-            return any(Player._needs_shift(t) for t in tok)
-        return tok in SHIFT_MAP or tok.isupper()
+        return _needs_shift_cached(tuple(tok) if isinstance(tok, list) else tok)
 
-    @staticmethod
-    def _neighbour(ch: str) -> str:
-        return random.choice(NEIGHBOURS.get(ch.lower(), list(NEIGHBOURS.keys())))
+    def _neighbour(self, ch: str) -> str:
+        opts = _NBR_TABLE.get(ch.lower(), _FALLBACK_KEYS)
+        return opts[int(self._rng.random() * len(opts))]
 
     # run -------------------------------------------------------------
     def run(self):   # noqa: C901
         try:
-            raw = self.sheet.read_text("utf-8")
+            txt, total = _load_sheet(self.sheet)
         except Exception as exc:
             self.q.put(("error", 0, str(exc))); return
 
-        toks = list(self._tokenise(raw)); total = len(toks)
+        _start_focus_hook()
         self.q.put(("total", total))
-        t0 = time.time()
+        clock = _Clock()
+        try:
+            self._play(self._tokenise(txt), clock)
+        finally:
+            clock.close()
+        self.q.put(("done", 1))
+
+    def _play(self, toks: Iterator, clock: _Clock):   # noqa: C901
+        t0   = time.time()
+        slot = time.perf_counter()              # grid time the current token starts
 
         for idx, tok in enumerate(toks, 1):
             if self.stop_evt.is_set(): break
+            i = (idx - 1) % SCHED_BLOCK
+            if i == 0: sched = _build_schedule(SCHED_BLOCK, self._rng)
 
             now = time.time()
             ios = now - self._last_token_time
             self._last_token_time = now
             density = max(0.0, min(1.0, (0.15 - ios) / 0.10))
 
-            σ, span, drift, h_jit, p_drop, p_slip, p_shift = self._params(density)
+            σ, span, drift, h_jit, p_drop, p_slip, p_shift = \
+                _compute_params(CFG.human, density)
             robot = (σ == 0)
 
             # sticky-Shift slip
             if self._last_shift_needed and isinstance(tok, str) and tok in SHIFT_REV \
-               and random.random() < p_shift:
+               and sched.shift[i] < p_shift * P_SCALE:
                 tok = SHIFT_REV[tok]
 
             # ordinary drop / slip
             slipped = False
-            if p_drop and random.random() < p_drop:
+            if p_drop and sched.drop[i] < p_drop * P_SCALE:
                 self.q.put(("progress", idx)); self._last_shift_needed = False; continue
-            if p_slip and isinstance(tok, str) and random.random() < p_slip:
+            if p_slip and isinstance(tok, str) and sched.slip[i] < p_slip * P_SCALE:
                 tok = self._neighbour(tok); slipped = True
 
-            sec = CFG.sec_per_tok() * (1 + drift *
-                  math.sin(2*math.pi*0.25*(time.time() - t0)))
-            onset_off = random.gauss(0, σ)
-
-            # focus / pause gate
-            while (not self.resume_evt.is_set()) or (
-                  CFG.auto_pause and CFG.target_title and
-                  win32gui.GetWindowText(win32gui.GetForegroundWindow()) != CFG.target_title):
-                if self.stop_evt.is_set(): break
-                time.sleep(0.05)
+            sec, onset_off = _compute_timing(CFG.sec_per_tok, drift, σ,
+                                             time.time() - t0, sched.onset[i])
+
+            # focus / pause gate – woken through wake_gate(); the timeout is
+            # only a safety net.  _may_play() may call into Win32 (WM_GETTEXT
+            # to the GUI thread), so it runs without holding _GATE.
+            while True:
+                seq = _gate_seq
+                if self.stop_evt.is_set() or self._may_play(): break
+                with _GATE:
+                    if seq == _gate_seq:
+                        _GATE.wait(0.5 if _fg_cache["hooked"] else 0.05)
             if self.stop_evt.is_set(): break
 
-            if onset_off > 0: time.sleep(onset_off)
+            # catch up small overruns, restart the grid after pauses / long holds
+            slot = max(slot, time.perf_counter() - MAX_LAG)
+            press_at = slot + onset_off
+            slot += sec
 
-            # play token
+            # play token – two deadlines: press, release
             if tok == "|":
-                time.sleep(sec)
+                clock.wait_until(slot)
 
             elif isinstance(tok, list):
-                if robot:
-                    for n in tok: press(n)
+                clock.wait_until(press_at)
+                if robot:               # one SendInput each way
+                    _send_batch(tok, True)
                     hold_len = max(0.06, CFG.hold * sec)
-                    time.sleep(hold_len)
-                    for n in reversed(tok): release(n)
-                    time.sleep(max(0.0, sec - hold_len))
-                else:
-                    base = time.perf_counter()
-                    for i, n in enumerate(tok):
+                    clock.wait_until(press_at + hold_len)
+                    _send_batch(tok, False)
+                else:                   # rolled – pynput both ways, keeps its Shift state
+                    for j, n in enumerate(tok):
                         press(n)
-                        if i < len(tok)-1:
-                            time.sleep(span * random.random())
-                    hold_var = 1 + random.uniform(-h_jit, h_jit)
-                    main_hold = max(0.06, sec*CFG.hold*hold_var)
-                    time.sleep(max(0.0, main_hold - (time.perf_counter()-base)))
+                        if j < len(tok)-1:
+                            clock.wait_until(time.perf_counter() + span * self._rng.random())
+                    hold_len = max(0.06, sec*CFG.hold*(1 + h_jit * sched.hold[i]))
+                    clock.wait_until(press_at + hold_len)
                     for n in reversed(tok): release(n)
-                    time.sleep(max(0.0, sec - (time.perf_counter()-base)))
 
             else:
+                clock.wait_until(press_at)
                 press(tok)
                 hold_len = max(
                     0.06,
-                    CFG.hold * sec * (1 + (random.uniform(-h_jit, h_jit) if not robot else 0))
+                    CFG.hold * sec * (1 + (h_jit * sched.hold[i] if not robot else 0))
                 )
-                time.sleep(hold_len + max(0.0, onset_off))
+                clock.wait_until(press_at + hold_len)
                 release(tok)
-                time.sleep(max(0.0, sec - hold_len - max(0.0, onset_off)))
-
-            if onset_off < 0: time.sleep(-onset_off)
 
             self.q.put(("progress", idx))
             self._last_shift_needed = self._needs_shift(tok)
 
-            if slipped and random.random() < 0.20:
-                time.sleep(random.uniform(0.3, 0.6))
-
-        self.q.put(("done", 1))
+            if slipped and self._rng.random() < 0.20:
+                slot += self._rng.uniform(0.3, 0.6)
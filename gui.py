@@ -10,6 +10,7 @@
 """
 
 from __future__ import annotations
+from functools import lru_cache
 from queue import Queue, Empty
 from pathlib import Path
 import tkinter as tk
@@ -52,20 +53,25 @@ class Tip:
             self.top.destroy(); self.top = None
 
 # ───────────────────── hot-key parser ────────────────────────────────
+_COMBO_TABLE: dict[str, Key] = {
+    "ctrl": Key.ctrl, "alt": Key.alt, "shift": Key.shift,
+    "cmd": Key.cmd,  "meta": Key.cmd,
+} | {f"f{i}": getattr(Key, f"f{i}") for i in range(1, 13)} | {
+    "space": Key.space, "enter": Key.enter, "tab": Key.tab,
+    "backspace": Key.backspace, "esc": Key.esc, "escape": Key.esc,
+}
+
+@lru_cache(maxsize=64)
 def parse_combo(expr: str) -> frozenset[Key | str]:
-    mod = {"ctrl": Key.ctrl, "alt": Key.alt, "shift": Key.shift,
-           "cmd": Key.cmd,  "meta": Key.cmd}
-    named = {f"f{i}": getattr(Key, f"f{i}") for i in range(1, 13)} | {
-        "space": Key.space, "enter": Key.enter, "tab": Key.tab,
-        "backspace": Key.backspace, "esc": Key.esc, "escape": Key.esc,
-    }
-    return frozenset(mod.get(p) or named.get(p) or p
+    return frozenset(_COMBO_TABLE.get(p, p)
                      for p in expr.lower().split("+") if p)
 
 # ─────────────────────────── GUI class ───────────────────────────────
 class App(tk.Tk):
     # ─── per-sheet META I/O helpers ──────────────────────────────────
     def _store_current_meta(self):
+        if self._meta_save_job:
+            self.after_cancel(self._meta_save_job); self._meta_save_job = None
         try:
             bpm    = int(self.var_bpm.get())
             subdiv = max(0.1, float(self.var_sub.get()))
@@ -96,6 +102,7 @@ class App(tk.Tk):
         self.toggle_combo = parse_combo(CFG.toggle)
         self._pressed: set = set()
         self._suspend_trace = False
+        self._meta_save_job: str | None = None
 
         self._build_form()
         self._build_fab()
@@ -208,8 +215,9 @@ class App(tk.Tk):
         self._refresh_sheets(); self._refresh_windows()
 
     def _note_changed(self):
-        # save on every keystroke
-        self._store_current_meta()
+        # save once typing pauses for 500 ms
+        if self._meta_save_job: self.after_cancel(self._meta_save_job)
+        self._meta_save_job = self.after(500, self._store_current_meta)
 
     def _get_note_text(self) -> str:
         return self.txt_note.get("1.0", "end-1c").strip()
@@ -266,7 +274,9 @@ class App(tk.Tk):
             self.var_sheet.set(vals[0])
 
     def _refresh_windows(self):
-        self.box_win["values"] = [t for _, t in core.windows()]
+        wins = core.windows()
+        self._win_hwnds = {t: h for h, t in wins}
+        self.box_win["values"] = [t for _, t in wins]
 
     # sheet switch
     def _on_sheet_change(self, _=None):
@@ -297,8 +307,8 @@ class App(tk.Tk):
         except ValueError: return
         core.write_sheet_meta(CFG.sheet, CFG.bpm, CFG.subdiv, self._get_note_text())
         if self.total_tokens:
-            self.prog["maximum"] = self.total_tokens * CFG.sec_per_tok()
-            self.prog["value"]   = self._tok_done   * CFG.sec_per_tok()
+            self.prog["maximum"] = self.total_tokens * CFG.sec_per_tok
+            self.prog["value"]   = self._tok_done   * CFG.sec_per_tok
         self._update_time(self._tok_done)
 
     # Humanise / Hold change
@@ -315,6 +325,7 @@ class App(tk.Tk):
                                    "Select a target window before enabling Auto-play.")
             self.var_auto.set(False); return
         CFG.auto_pause = self.var_auto.get()
+        core.wake_gate()
 
     # play / pause
     def _fab_pressed(self):
@@ -336,6 +347,8 @@ class App(tk.Tk):
         except Exception as exc:
             messagebox.showerror("Config error", str(exc)); return False
         CFG.target_title = self.var_win.get().strip() or None
+        CFG.target_hwnd  = self._win_hwnds.get(CFG.target_title, 0)
+        core.wake_gate()
         if self.var_auto.get() and not CFG.target_title:
             messagebox.showwarning("Target window required",
                                    "Auto-play is enabled but no target window selected.")
@@ -362,29 +375,35 @@ class App(tk.Tk):
         if self.toggle_combo.issubset(self._pressed): self.after(0, self._fab_pressed)
     def _hk_release(self, k): self._pressed.discard(k)
 
-    # queue poller
+    # queue poller – drain everything, then touch the widgets once per tick
     def _poll(self):
+        total = done = None; finished = False
         try:
             while True:
                 tag, *d = self.queue.get_nowait()
-                if tag == "total":
-                    self.total_tokens = d[0]
-                    self.prog["maximum"] = self.total_tokens * CFG.sec_per_tok()
-                    self._update_time(0)
-                elif tag == "progress":
-                    self._tok_done = d[0]
-                    self.prog["value"] = self._tok_done * CFG.sec_per_tok()
-                    self._update_time(self._tok_done)
-                elif tag == "done":
-                    self._stop_player()
-                    self.prog["value"] = self.total_tokens * CFG.sec_per_tok()
+                if tag == "total":      total, done = d[0], None
+                elif tag == "progress": done = d[0]
+                elif tag == "done":     finished = True
         except Empty: pass
+
+        if total is not None:
+            self.total_tokens = total
+            self.prog["maximum"] = self.total_tokens * CFG.sec_per_tok
+            if done is None: self._update_time(0)
+        if done is not None:
+            self._tok_done = done
+            self.prog["value"] = self._tok_done * CFG.sec_per_tok
+            self._update_time(self._tok_done)
+        if finished:
+            self._stop_player()
+            self.prog["value"] = self.total_tokens * CFG.sec_per_tok
         self.after(50, self._poll)
 
     def _update_time(self, done_tok: int):
         if not self.total_tokens: return
-        sec_done = done_tok * CFG.sec_per_tok()
-        sec_tot  = self.total_tokens * CFG.sec_per_tok()
+        spt      = CFG.sec_per_tok
+        sec_done = done_tok * spt
+        sec_tot  = self.total_tokens * spt
         fmt = lambda s: f"{int(s//60):02d}:{int(s%60):02d}"
         self.lbl_time["text"] = f"{fmt(sec_done)} / {fmt(sec_tot)}"
 